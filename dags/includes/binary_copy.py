@@ -0,0 +1,93 @@
+import io
+import struct
+from typing import Iterator
+import pandas as pd
+from util.config import indicators_column_names
+
+# Column order of the target table; COPY and the DataFrame are aligned to it
+table_columns = ["country_name", "country_iso3", "year", *indicators_column_names.values()]
+
+# PGCOPY binary framing: signature, flags and header extension length, then a -1 field count as trailer
+_PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+_PGCOPY_TRAILER = struct.pack("!h", -1)
+_FIELD_COUNT = struct.pack("!h", len(table_columns))
+_NULL_FIELD = struct.pack("!i", -1)
+_INT4_FIELD = struct.Struct("!ii")
+_FLOAT8_FIELD = struct.Struct("!id")
+
+# Matches the 64 KB send buffer used by Postgres for COPY traffic
+copy_chunk_size = 64 * 1024
+
+
+def _encode_text(value: str) -> bytes:
+    """Encode a TEXT/VARCHAR value as a length-prefixed binary COPY field."""
+    data = value.encode("utf-8")
+    return struct.pack("!i", len(data)) + data
+
+
+def iter_binary_copy(df: pd.DataFrame, chunk_size: int = copy_chunk_size) -> Iterator[bytes]:
+    """
+    Serialize the wide DataFrame into PostgreSQL's binary COPY format, chunk by chunk.
+
+    Each row is written as (country_name TEXT, country_iso3 VARCHAR, year INTEGER,
+    indicators FLOAT8...), in the order of ``table_columns``. NaN indicator
+    values are written as SQL NULL. Rows are accumulated until ``chunk_size``
+    bytes are buffered, so only one chunk is held in memory at a time.
+
+    Args:
+        df (pd.DataFrame): Validated wide-format DataFrame.
+        chunk_size (int): Approximate size in bytes of each yielded chunk.
+
+    Yields:
+        bytes: Consecutive pieces of the COPY stream, header and trailer included.
+    """
+    chunk = bytearray(_PGCOPY_HEADER)
+
+    for country_name, country_iso3, year, *values in df[table_columns].itertuples(index=False, name=None):
+        chunk += _FIELD_COUNT
+        chunk += _encode_text(country_name)
+        chunk += _encode_text(country_iso3)
+        chunk += _INT4_FIELD.pack(4, int(year))
+        for value in values:
+            # NaN is the only value that is not equal to itself
+            if value is None or value != value:
+                chunk += _NULL_FIELD
+            else:
+                chunk += _FLOAT8_FIELD.pack(8, value)
+
+        if len(chunk) >= chunk_size:
+            yield bytes(chunk)
+            chunk.clear()
+
+    chunk += _PGCOPY_TRAILER
+    yield bytes(chunk)
+
+
+class CopyStream(io.RawIOBase):
+    """
+    Read-only file object over an iterator of byte chunks.
+
+    ``cursor.copy_expert`` pulls data with ``read(size)``; each read only
+    encodes as many rows as needed, so serialization overlaps with sending
+    data to Postgres instead of building the whole payload up front.
+    """
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._pending = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        # Pull the next chunk once the current one has been fully consumed
+        while not self._pending:
+            try:
+                self._pending = memoryview(next(self._chunks))
+            except StopIteration:
+                return 0
+
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
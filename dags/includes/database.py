@@ -1,14 +1,141 @@
 import logging
-import io
+import hashlib
 import os
+from contextlib import contextmanager
 import pandas as pd
+from psycopg2 import errors, sql
 from airflow.providers.postgres.hooks.postgres import PostgresHook
-from util.config import postgres_conn_id, indicators_column_names, database_table_name, json_folder
-from includes.extraction import validate_data
+from util.config import postgres_conn_id, indicators_column_names, database_table_name, raw_data_file
+from includes.binary_copy import CopyStream, copy_chunk_size, iter_binary_copy, table_columns
+from includes.extraction import transform_to_dataframe, validate_data
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
 
-def create_metric_table() -> None:
+# Fixed base columns followed by all indicator columns from config
+column_definitions = (
+    "country_name TEXT",
+    "country_iso3 VARCHAR(3)",
+    "year INTEGER",
+    *(f"{col_name} FLOAT" for col_name in indicators_column_names.values())
+)
+
+# Table DDL only depends on config, so it is built once at import
+create_table_sql = f"""
+CREATE TABLE IF NOT EXISTS {database_table_name} (
+    {', '.join(column_definitions)},
+    PRIMARY KEY (country_iso3, year)
+);
+"""
+
+# Brings a table created from an older config up to date; columns that
+# already exist are left alone, so it is a no-op right after CREATE TABLE
+add_indicator_columns_sql = f"""
+ALTER TABLE {database_table_name}
+    {', '.join(f"ADD COLUMN IF NOT EXISTS {col_name} FLOAT" for col_name in indicators_column_names.values())};
+"""
+
+# Any change to the indicator columns changes the recorded version
+schema_version = hashlib.sha256(create_table_sql.encode("utf-8")).hexdigest()[:16]
+
+# Load statements only depend on config, so they are composed once at import.
+# Table and column names are quoted as identifiers rather than interpolated.
+staging_table = f"{database_table_name}_staging"
+_target = sql.Identifier(database_table_name)
+_staging = sql.Identifier(staging_table)
+
+# Temporary staging table with the same columns as the final table. Only
+# defaults are copied: INCLUDING ALL would also copy the primary key, whose
+# index then has to be maintained for every row COPY writes. The table is
+# dropped with the load transaction, so no leftover needs cleaning up.
+create_staging_sql = sql.SQL(
+    "CREATE TEMP TABLE {staging} (LIKE {target} INCLUDING DEFAULTS) ON COMMIT DROP"
+).format(staging=_staging, target=_target)
+
+# Opens the load transaction. The load can simply be re-run, so don't wait
+# on the WAL flush at commit; SET LOCAL scopes this to the transaction only
+begin_load_sql = sql.SQL("SET LOCAL synchronous_commit = off;\n") + create_staging_sql
+
+copy_sql = sql.SQL("COPY {staging} ({columns}) FROM STDIN WITH (FORMAT BINARY)").format(
+    staging=_staging,
+    columns=sql.SQL(", ").join(map(sql.Identifier, table_columns))
+)
+
+# Sent as one execute, so all three statements cost a single round trip.
+# Replace matching rows instead of ON CONFLICT, which checks for a
+# conflict and rewrites every column row by row. Staged rows identical to
+# the stored ones are discarded first, so only new or changed rows are
+# deleted and re-inserted, and unchanged rows leave no dead tuples or WAL.
+# All statements run in the same transaction, so readers never see the
+# rows missing.
+merge_sql = sql.SQL("""
+DELETE FROM {staging} AS staging
+USING {target} AS target
+WHERE target.country_iso3 = staging.country_iso3
+  AND target.year = staging.year
+  AND ROW(target.*) IS NOT DISTINCT FROM ROW(staging.*);
+
+DELETE FROM {target} AS target
+USING {staging} AS staging
+WHERE target.country_iso3 = staging.country_iso3
+  AND target.year = staging.year;
+
+INSERT INTO {target}
+SELECT * FROM {staging};
+""").format(target=_target, staging=_staging)
+
+# Records which version of each table's DDL has been applied
+create_schema_version_sql = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    table_name TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+"""
+
+# Recorded version of the table, or no row if the table itself is missing
+current_schema_version_sql = """
+SELECT version FROM schema_version
+WHERE table_name = %s AND to_regclass(%s) IS NOT NULL;
+"""
+
+record_schema_version_sql = """
+INSERT INTO schema_version (table_name, version) VALUES (%s, %s)
+ON CONFLICT (table_name) DO UPDATE
+SET version = EXCLUDED.version, applied_at = now();
+"""
+
+
+@contextmanager
+def postgres_connection(conn=None):
+    """
+    Yield a Postgres connection, opening one only if none is supplied.
+
+    A connection passed in by the caller is reused as-is and left open, so
+    several steps can share it. Otherwise a new connection is opened through
+    PostgresHook and closed on exit. The application_name reported in
+    pg_stat_activity and TCP keepalives are taken from the Airflow
+    connection extras, so no setup statement is sent.
+
+    Args:
+        conn (optional): Open psycopg2 connection to reuse.
+
+    Yields:
+        Open psycopg2 connection.
+    """
+    if conn is not None:
+        yield conn
+        return
+
+    hook = PostgresHook(postgres_conn_id=postgres_conn_id)
+    conn = hook.get_conn()
+    try:
+        yield conn
+    finally:
+        # psycopg2's "with conn" only ends the transaction, it never closes
+        conn.close()
+
+
+def create_metric_table(conn=None) -> None:
     """
     Create PostgreSQL table for ECOWAS indicators with dynamic schema.
     
@@ -16,52 +143,69 @@ def create_metric_table() -> None:
     and dynamically adds indicator columns from configuration. Uses composite
     primary key on (country_iso3, year).
     
+    The DDL only runs when needed: a fingerprint of it is recorded in the
+    schema_version table, and when both the table and a matching fingerprint
+    already exist the function runs a single query and takes no DDL lock.
+    A table created from an older config gets any missing indicator columns
+    added before the new fingerprint is recorded.
+    
+    Args:
+        conn (optional): Open psycopg2 connection to reuse. A new one is
+                         opened and closed if not given.
+    
     Returns:
         None
     
     Raises:
         Exception: If table creation fails. Error details are logged with traceback.
     """
-    # Define fixed base columns for the table
-    column_definitions = [
-        "country_name TEXT",
-        "country_iso3 VARCHAR(3)",
-        "year INTEGER" 
-    ]
-    
-    # Add all indicator columns dynamically from config
-    for col_name in indicators_column_names.values():
-        column_definitions.append(f"{col_name} FLOAT")
-
-    create_table_sql = f"""
-    CREATE TABLE IF NOT EXISTS {database_table_name} (
-        {', '.join(column_definitions)},
-        PRIMARY KEY (country_iso3, year)
-    );
-    """
-
-    logging.info(f"Preparing to create table '{database_table_name}' if it does not exist.")
-
     try:
         # Initialize Postgres connection
-        hook = PostgresHook(postgres_conn_id=postgres_conn_id)
-        with hook.get_conn() as conn:
+        with postgres_connection(conn) as conn:
             with conn.cursor() as cursor:
-                cursor.execute(create_table_sql)  
+                try:
+                    cursor.execute(current_schema_version_sql, (database_table_name, database_table_name))
+                    row = cursor.fetchone()
+                except errors.UndefinedTable:
+                    # schema_version does not exist yet on the very first run
+                    conn.rollback()
+                    row = None
+                current_version = row[0] if row else None
+
+                if current_version == schema_version:
+                    logging.info(f"Table '{database_table_name}' is up to date, skipping creation.")
+                else:
+                    logging.info(f"Preparing to create table '{database_table_name}' if it does not exist.")
+                    cursor.execute(create_table_sql)
+                    # CREATE TABLE IF NOT EXISTS leaves an existing table untouched
+                    cursor.execute(add_indicator_columns_sql)
+                    cursor.execute(create_schema_version_sql)
+                    cursor.execute(record_schema_version_sql, (database_table_name, schema_version))
+                    logging.info("Metric table created successfully")
                 conn.commit()
-                logging.info("Metric table created successfully")
     except Exception as e:
         logging.error(f"Error creating metric table: {e}", exc_info=True)
         raise
 
 
-def load_dataframe_to_postgres() -> None:
+def load_dataframe_to_postgres(df: pd.DataFrame = None, raw_data: list = None, conn=None) -> None:
     """
     Load validated DataFrame into PostgreSQL using upsert strategy.
     
-    Uses a staging table and COPY command for efficient bulk loading, then
-    merges data into the final table with ON CONFLICT handling to update
-    existing records or insert new ones based on (country_iso3, year) key.
+    Uses a staging table and binary COPY command for efficient bulk loading, then
+    merges data into the final table in one transaction by deleting rows that
+    share a (country_iso3, year) key with the staging data and inserting the
+    staged rows.
+    
+    Args:
+        df (pd.DataFrame, optional): Frame already validated by validate_data,
+                                     as returned by the validation task. If None,
+                                     it is transformed and validated here.
+        raw_data (list, optional): Records returned by extract_world_bank_data,
+                                   used only when df is None. If also None, they
+                                   are read from raw_data_file.
+        conn (optional): Open psycopg2 connection to reuse. A new one is
+                         opened and closed if not given.
     
     Returns:
         None
@@ -69,37 +213,24 @@ def load_dataframe_to_postgres() -> None:
     Raises:
         Exception: If database operations fail during staging, copy, or merge.
     """
-    df = validate_data()
+    # The validation task has normally done the transform already
+    if df is None:
+        df = validate_data(transform_to_dataframe(raw_data))
+
     try:
         # Open Postgres connection
-        hook = PostgresHook(postgres_conn_id=postgres_conn_id)
-        with hook.get_conn() as conn:
+        with postgres_connection(conn) as conn:
             with conn.cursor() as cursor:
                 logging.info("loading data into database")
-                staging_table = f"{database_table_name}_staging"
-                cursor.execute(f"DROP TABLE IF EXISTS {staging_table}")
-                # Create a temporary staging table with same structure as final table
-                cursor.execute(f"CREATE TEMP TABLE {staging_table} (LIKE {database_table_name} INCLUDING ALL)")
-
-                buffer = io.StringIO()
-                # Export DataFrame to CSV format without headers
-                df.to_csv(buffer, index=False, header=False)
-                buffer.seek(0)
-                cursor.copy_expert(f"COPY {staging_table} FROM STDIN WITH CSV", buffer)
+                # Session setup and staging DDL go out in one round trip
+                cursor.execute(begin_load_sql)
+
+                # Binary COPY skips the float -> text -> float round trip of CSV,
+                # and the stream encodes rows only as Postgres consumes them
+                stream = CopyStream(iter_binary_copy(df))
+                cursor.copy_expert(copy_sql, stream, size=copy_chunk_size)
                 logging.info(f"Copied {len(df)} rows to staging table")
 
-                merge_sql = f"""
-                INSERT INTO {database_table_name}
-                SELECT * FROM {staging_table}
-                ON CONFLICT (country_iso3, year) DO UPDATE
-                SET
-                    country_name = EXCLUDED.country_name,
-                    {', '.join([
-                        f"{col} = EXCLUDED.{col}"
-                        for col in df.columns
-                        if col not in ['country_iso3','year','country_name']
-                    ])};
-                """
                 cursor.execute(merge_sql)
                 logging.info("Merge operation completed successfully")
 
@@ -110,10 +241,10 @@ def load_dataframe_to_postgres() -> None:
         raise
 
     try:
-        logging.info(f"Cleaning up temporary file: {json_folder}")
-        if os.path.exists(json_folder):
-            os.remove(json_folder)
-            logging.info(f"Cleaned up temporary file: {json_folder} successful")
+        logging.info(f"Cleaning up temporary file: {raw_data_file}")
+        if os.path.exists(raw_data_file):
+            os.remove(raw_data_file)
+            logging.info(f"Cleaned up temporary file: {raw_data_file} successful")
     except Exception as e:
-        logging.warning(f"Failed to delete temporary file {json_folder}: {e}")
+        logging.warning(f"Failed to delete temporary file {raw_data_file}: {e}")
         raise
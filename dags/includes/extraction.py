@@ -2,169 +2,458 @@ import requests
 import pandas as pd
 import pandera as pa
 import logging
-import json
+import ijson
 import os
-from time import sleep  
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
 from pathlib import Path 
-from util.config import ecowas_country, indicators, start_year, end_year, indicators_column_names, json_folder
-from includes.validation import get_wide_schema
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from util.config import ecowas_country, indicators, start_year, end_year, indicators_column_names, raw_data_file, persist_raw_data, validated_rows_manifest
+from includes.validation import get_wide_schema, get_schema_fingerprint
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Number of indicators fetched from the World Bank API in parallel
+max_workers = 8
+
+# Records per API page; smaller pages are parsed in short bursts and let
+# the pages of one indicator download in parallel
+per_page = 200
+
+# Semicolon-separated ISO3 codes of all ECOWAS countries
+country_str = ";".join(ecowas_country.keys())
+
+# All configured indicators come from World Development Indicators (source 2),
+# so they can be requested together; the API only accepts several indicators
+# in one request when their source is given
+wdi_source_id = 2
+batch_indicator_code = ";".join(indicators)
+
+# World Bank API URL with everything but the indicator and page filled in
+indicator_url_template = (
+    f"http://api.worldbank.org/v2/country/{country_str}/indicator/{{indicator_code}}"
+    f"?format=json&date={start_year}:{end_year}&per_page={per_page}&page={{page}}"
+)
+
+# Categorical dtype over the configured World Bank indicator codes
+indicator_code_dtype = pd.CategoricalDtype(categories=list(indicators_column_names))
+
+# Columns and dtypes of the wide-format frame, used to build it when empty
+wide_column_dtypes = {
+    "country_name": str,
+    "country_iso3": str,
+    "year": "int16",
+    **dict.fromkeys(indicators_column_names.values(), "float64")
+}
+
+# Flattened World Bank record fields mapped to the long-format column names
+raw_field_names = {
+    "country.value": "country_name",
+    "countryiso3code": "country_iso3",
+    "date": "year",
+    "indicator.id": "indicator_code",
+    "value": "value"
+}
+
+
+def create_session() -> requests.Session:
+    """
+    Build an HTTP session with a connection pool shared by the fetch workers.
+
+    Keep-alive connections are reused across indicator requests, and throttling
+    (429) or transient server errors are retried with exponential backoff.
+
+    Returns:
+        requests.Session: Session with a pooled, retrying adapter mounted.
+    """
+    retry = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504]
+    )
+    adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# Shared by every fetch in this process, so keep-alive connections outlive a
+# single extraction. Creating it opens no connection, so it is cheap at DAG parse
+http_session = create_session()
+
+
+def count_pages(events, meta: dict):
+    """
+    Pass ijson parse events through, recording the page count from the metadata.
+
+    Args:
+        events: Event iterator from ijson.parse.
+        meta (dict): Receives the "pages" value once the metadata is parsed.
+
+    Yields:
+        tuple: The unchanged (prefix, event, value) events.
+    """
+    for prefix, event, value in events:
+        if prefix == "item.pages":
+            meta["pages"] = int(value)
+        yield prefix, event, value
+
 
-def extract_world_bank_data() -> json:
+def fetch_indicator_page(indicator_code: str, page: int) -> tuple:
     """
-    Extract World Bank indicator data for ECOWAS countries and save to JSON.
+    Fetch one page of a World Bank indicator for the ECOWAS countries.
+
+    Args:
+        indicator_code (str): World Bank indicator code, or batch_indicator_code
+                              to fetch all configured indicators at once.
+        page (int): 1-based page number.
+
+    Returns:
+        tuple: (total number of pages, records of this page). Records are empty
+               if the API returned no data or failed.
+    """
+    # Construct the World Bank API URL
+    url = indicator_url_template.format(indicator_code=indicator_code, page=page)
+    if indicator_code == batch_indicator_code:
+        url += f"&source={wdi_source_id}"
+    logging.info(f"Fetching page {page} of indicator: {indicators.get(indicator_code, indicator_code)}")
+
+    try:
+        # Make GET request to API with a 30s timeout safeguard, streaming the body
+        with http_session.get(url, timeout=30, stream=True) as response:
+            response.raise_for_status()  # Raise exception if HTTP status code indicates error
+
+            # Let urllib3 undo any gzip/deflate encoding while streaming
+            response.raw.decode_content = True
+
+            # World Bank API responses are a list: [metadata, data]. Records of
+            # index 1 are parsed as they arrive, so the whole JSON tree is never
+            # held in memory alongside the records; the page count is picked
+            # out of the metadata on the way
+            meta = {}
+            events = count_pages(ijson.parse(response.raw, use_float=True), meta)
+            records = list(ijson.items(events, "item.item"))
+
+        if records:
+            return meta.get("pages", 1), records
+        logging.warning(f"No data returned for indicator: {indicator_code} (page {page})")
+
+    # Handle various error types separately for clearer debugging
+    except requests.exceptions.HTTPError as http_err:
+        logging.error(f"HTTP error occurred for {indicator_code}: {http_err}")
+    except requests.exceptions.RequestException as req_err:
+        logging.error(f"Request error for {indicator_code}: {req_err}")
+    except urllib3.exceptions.HTTPError as stream_err:
+        # Reading response.raw directly surfaces urllib3 errors unwrapped
+        logging.error(f"Stream error for {indicator_code}: {stream_err}")
+    except (ijson.JSONError, ValueError) as json_err:
+        logging.error(f"JSON decode error for {indicator_code}: {json_err}")
+
+    return 0, []
+
+
+def extract_world_bank_data() -> list:
+    """
+    Extract World Bank indicator data for ECOWAS countries.
     
     Queries the World Bank API for multiple indicators across ECOWAS countries
-    within the specified date range. All data is aggregated and saved to a file.
+    within the specified date range. All indicators are requested together
+    in one batched query; once its first page reports the total page count,
+    the remaining pages are fetched concurrently over a shared session. If
+    the batched query returns nothing, each indicator is fetched on its own
+    the same way instead. All data is
+    aggregated and returned, so Airflow hands it to the next tasks through
+    XCom; it is also saved to a Parquet file when persist_raw_data is enabled.
     
     Returns:
-        json: List of all indicator data records, or None if extraction fails.
-    
+        list: List of all indicator data records, or None if extraction fails.
+
+    Raises:
+        RuntimeError: If any page after the first of a query fails, so the
+                      task is retried instead of loading a partial extract.
     """
     all_data = []
-    country_str = ";".join(ecowas_country)
+    failed_pages = []
     logging.info(f"Beginning data extraction for {len(ecowas_country)} countries.")
 
-    for indicator_code, indicator_name in indicators.items():
+    # Requests are I/O-bound, so worker threads overlap the network round trips
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # One query for every indicator saves a round trip per indicator
+        pending = {
+            executor.submit(fetch_indicator_page, batch_indicator_code, 1): (batch_indicator_code, 1)
+        }
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                indicator_code, page = pending.pop(future)
+                pages, records = future.result()
+                all_data.extend(records)
+
+                # A later page is known to exist, so an empty result means it
+                # failed; loading without it would overwrite stored values with NULL
+                if page > 1 and not records:
+                    failed_pages.append((indicator_code, page))
+
+                # Fall back to one query per indicator if the batch was rejected
+                if indicator_code == batch_indicator_code and page == 1 and not records:
+                    logging.warning("Batched indicator request failed, fetching indicators individually")
+                    for single_code in indicators:
+                        future = executor.submit(fetch_indicator_page, single_code, 1)
+                        pending[future] = (single_code, 1)
+
+                # Only the first page knows how many follow; queue the rest from
+                # here rather than inside a worker, so no worker blocks on the pool
+                if page == 1:
+                    for next_page in range(2, pages + 1):
+                        future = executor.submit(fetch_indicator_page, indicator_code, next_page)
+                        pending[future] = (indicator_code, next_page)
+
+    if failed_pages:
+        logging.error(f"Extraction failed. Pages could not be fetched: {failed_pages}")
+        raise RuntimeError(f"Failed to fetch {len(failed_pages)} World Bank page(s): {failed_pages}")
 
-        # Construct the World Bank API URL
-        url = (
-            f"http://api.worldbank.org/v2/country/{country_str}/indicator/{indicator_code}"
-            f"?format=json&date={start_year}:{end_year}&per_page=1000"
-        )
-        logging.info(f"Fetching data for indicator: {indicator_name}")
+    logging.info("Data extraction completed")
+    if not all_data:
+        logging.error("Extraction failed. No data was retrieved from the API.")
+        return None
 
-        try:
-            # Make GET request to API with a 30s timeout safeguard
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()  # Raise exception if HTTP status code indicates error
+    # Keep a copy on disk only when it is needed for debugging
+    if persist_raw_data:
+        logging.info(f"Saving raw extracted data to {raw_data_file}")
 
-            data = response.json()
+        # Store the flattened records as compressed, typed columns rather than text
+        write_parquet_atomic(flatten_records(all_data), raw_data_file, compression="zstd")
 
-            # World Bank API responses are a list: [metadata, data]. We want index 1.
-            if len(data) > 1 and data[1]:
-                all_data.extend(data[1]) 
-            else:
-                logging.warning(f"No data returned for indicator: {indicator_code}")
+    return all_data
 
-        # Handle various error types separately for clearer debugging
-        except requests.exceptions.HTTPError as http_err:
-            logging.error(f"HTTP error occurred for {indicator_code}: {http_err}")
-        except requests.exceptions.RequestException as req_err:
-            logging.error(f"Request error for {indicator_code}: {req_err}")
-        except ValueError as json_err:
-            logging.error(f"JSON decode error for {indicator_code}: {json_err}")
 
-        sleep(0.5)
-    logging.info("Data extraction completed")
-    if not all_data:
-        logging.error("Extraction failed. No data was retrieved from the API.")
-        return None
+def write_parquet_atomic(df: pd.DataFrame, path: str, **kwargs) -> None:
+    """
+    Write a DataFrame to Parquet so that readers never see a partial file.
+
+    The frame is written to a temporary file next to the target and then
+    renamed over it; the rename is atomic on the same filesystem, so a
+    crashed writer leaves the previous file intact.
+
+    Args:
+        df (pd.DataFrame): Frame to write, without its index.
+        path (str): Destination file; its directory is created if missing.
+        **kwargs: Extra arguments passed to DataFrame.to_parquet.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    try:
+        df.to_parquet(tmp_path, index=False, **kwargs)
+        os.replace(tmp_path, path)
+    finally:
+        # Only left behind if the write or rename failed
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
 
-    # Save raw data 
-    logging.info(f"Saving raw extracted data to {json_folder}")
-    os.makedirs("/opt/airflow/tmp", exist_ok=True)
+def flatten_records(raw_data: list) -> pd.DataFrame:
+    """
+    Flatten raw World Bank records into a long-format DataFrame.
+
+    Args:
+        raw_data (list): Records returned by the World Bank API.
+
+    Returns:
+        pd.DataFrame: One row per record with country_name, country_iso3,
+                      year, indicator_code and value columns.
+    """
+    # Flatten nested JSON entries in one vectorized pass and keep only the
+    # fields needed for the pivot
+    return pd.json_normalize(raw_data)[list(raw_field_names)].rename(columns=raw_field_names)
 
-    # Dump JSON into configured landing file
-    with open(json_folder, 'w', encoding='utf-8') as f:
-        json.dump(all_data, f, indent=4)
+
+def empty_wide_frame() -> pd.DataFrame:
+    """
+    Build an empty wide-format DataFrame with the expected columns and dtypes.
+
+    Returns:
+        pd.DataFrame: Frame with no rows that still passes the wide schema.
+    """
+    return pd.DataFrame(columns=list(wide_column_dtypes)).astype(wide_column_dtypes)
 
 
-def transform_to_dataframe() -> pd.DataFrame:
+def transform_to_dataframe(raw_data: list = None) -> pd.DataFrame:
     """
     Transform raw World Bank JSON data into a clean wide-format DataFrame.
     
-    Loads the previously extracted JSON data, flattens nested structures,
-    converts to DataFrame, and pivots from long to wide format where each
-    row represents a country-year and columns represent different indicators.
+    Flattens the extracted records (or loads the persisted Parquet file when
+    none are passed) into a DataFrame, and pivots from long to wide format
+    where each row represents a country-year and columns represent different
+    indicators.
+    
+    Args:
+        raw_data (list, optional): Records returned by extract_world_bank_data.
+                                   If None, they are read from raw_data_file.
     
     Returns:
         pd.DataFrame: Wide-format DataFrame with countries and years as rows,
-                        indicators as columns. Empty DataFrame if raw data is empty.
+                        indicators as columns. Empty DataFrame with the wide
+                        columns if raw data is empty or has no valid records.
     
     """
-    logging.info(f"Reading raw data from {json_folder}")
-
-    # Load previously saved JSON file
-    with open(json_folder, 'r', encoding='utf-8') as f:
-        raw_data = json.load(f)
-
-    # Handle case where file exists but is empty
-    if not raw_data:
-        logging.warning("Raw data file is empty. Returning an empty DataFrame.")
-        return pd.DataFrame()
+    if raw_data is None:
+        logging.info(f"Reading raw data from {raw_data_file}")
 
-    # Flatten JSON entries into row dictionaries
-    records = []
-    for entry in raw_data:
-        records.append({
-            "country_name": entry.get("country", {}).get("value"),          
-            "country_iso3": entry.get("countryiso3code"),              
-            "year": entry.get("date"),  
-            "indicator_code": entry.get("indicator", {}).get("id"), 
-            "indicator_name": indicators.get(entry.get("indicator", {}).get("id")), 
-            "value": entry.get("value")                                   
-        })
+        # Load previously saved records, already flattened
+        df = pd.read_parquet(raw_data_file)
+    elif raw_data:
+        df = flatten_records(raw_data)
+    else:
+        df = pd.DataFrame()
 
-    # Convert list of dicts into DataFrame
-    df = pd.DataFrame(records)
+    # Handle case where no records were extracted
+    if df.empty:
+        logging.warning("Raw data is empty. Returning an empty DataFrame.")
+        return empty_wide_frame()
 
     logging.info("Cleaning and transforming data")
 
-    # Convert year and value fields into numeric, coercing invalid entries to NaN
-    df['year'] = pd.to_numeric(df['year'], errors='coerce')
-    df['value'] = pd.to_numeric(df['value'], errors='coerce')
+    # Convert year and value fields into numeric in one pass, coercing invalid
+    # entries to NaN. The pivoted columns are then already numeric, so no
+    # per-indicator conversion is needed afterwards
+    numeric_columns = ["year", "value"]
+    df[numeric_columns] = df[numeric_columns].apply(pd.to_numeric, errors='coerce')
 
     logging.info("Pivoting data from long to wide format")
 
-    # Pivot: each row is (country, iso, year), each column is an indicator
-    df_wide = df.pivot_table(
-        index=["country_name", "country_iso3", "year"],
-        columns="indicator_code",
-        values="value"
-    ).reset_index()
+    # Each step below hands its result straight to the next, so no
+    # intermediate long frame stays referenced once the next one is built
+    df = (
+        df
+        # Categorical codes let the pivot reshape on integer codes instead of
+        # hashing strings; codes outside the configured indicators become NaN
+        .astype({"indicator_code": indicator_code_dtype})
+        # pivot_table silently dropped missing keys and values while
+        # aggregating; drop them explicitly since pivot does not aggregate
+        .dropna(subset=["country_name", "country_iso3", "year", "indicator_code", "value"])
+    )
+
+    # Nothing left to pivot when every record had a missing key or value
+    if df.empty:
+        logging.warning("No valid records left after dropping missing values. Returning an empty DataFrame.")
+        return empty_wide_frame()
+
+    df_wide = (
+        df
+        # pivot raises on repeated keys, which a page shifting between
+        # paginated requests can produce; keep the most recently fetched record
+        .drop_duplicates(subset=["country_iso3", "year", "indicator_code"], keep="last")
+        # Years fit in int16, a quarter of the float64 left by to_numeric.
+        # Values stay float64: population totals exceed float32's exact
+        # integer range
+        .astype({"year": "int16"})
+        # Each row is (country, iso, year), each column is an indicator.
+        # (country, year, indicator) is unique after the de-duplication
+        # above, so pivot avoids the groupby-mean that pivot_table runs
+        .pivot(
+            index=["country_name", "country_iso3", "year"],
+            columns="indicator_code",
+            values="value"
+        )
+        # Plain string column labels, so reset_index can add the key columns
+        .pipe(lambda wide: wide.set_axis([indicators_column_names[code] for code in wide.columns], axis=1))
+        .reset_index()
+    )
+
+    logging.info(f"Successfully transformed data. Final shape: {df_wide.shape}")
+    return df_wide
 
-    df_wide.columns.name = None
 
-    logging.info("Renaming columns for clarity")
+def load_validated_hashes() -> pd.Series:
+    """
+    Load the row hashes recorded by the last successful validation.
 
-    df_wide.rename(columns=indicators_column_names, inplace=True)
+    Hashes recorded under a different version of the wide schema are ignored,
+    so a new or tightened check is applied to every row again.
 
-    logging.info(f"Successfully transformed data. Final shape: {df.shape}")
-    return df_wide
+    Returns:
+        pd.Series: Row hashes, empty if no manifest has been written yet or it
+                   was written for another schema.
+    """
+    if not os.path.exists(validated_rows_manifest):
+        return pd.Series(dtype="uint64")
 
+    manifest = pd.read_parquet(validated_rows_manifest)
+    if "schema_version" not in manifest or (manifest["schema_version"] != get_schema_fingerprint()).any():
+        logging.info("Validation manifest was written for another schema, validating all rows")
+        return pd.Series(dtype="uint64")
+    return manifest["row_hash"]
 
-def validate_data() -> pd.DataFrame:
+
+def save_validated_hashes(row_hashes: pd.Series) -> None:
+    """
+    Record the row hashes of a successfully validated DataFrame, tagged with
+    the fingerprint of the schema they were validated against.
+
+    Args:
+        row_hashes (pd.Series): Hashes from pd.util.hash_pandas_object.
+    """
+    manifest = row_hashes.rename("row_hash").to_frame().assign(schema_version=get_schema_fingerprint())
+    write_parquet_atomic(manifest, validated_rows_manifest)
+
+
+def validate_data(df: pd.DataFrame = None, raw_data: list = None) -> pd.DataFrame:
     """
     Validate transformed DataFrame against the wide-format quality schema.
     
-    Runs the transformation pipeline to get fresh data, then validates it
-    using Pandera schema rules. Logs all validation errors if checks fail.
+    Validates the given DataFrame using Pandera schema rules, running the
+    transformation pipeline first only if no DataFrame is passed in. Rows
+    identical to ones that passed the previous validation are skipped, so
+    only new or changed rows go through the checks. Delete
+    validated_rows_manifest to force a full validation.
+
+    Validation stops at the first failing check. Set the DEBUG_VALIDATION
+    environment variable to "1" to run every check and log all failure
+    cases instead.
+    
+    Args:
+        df (pd.DataFrame, optional): Wide-format DataFrame to validate. If None,
+                                     it is built with transform_to_dataframe().
+        raw_data (list, optional): Extracted records passed on to
+                                   transform_to_dataframe() when df is None.
     
     Returns:
         pd.DataFrame: Validated DataFrame that passes all schema checks.
     
     Raises:
-        pa.errors.SchemaErrors: If data fails validation. Failure cases are
-                                logged before raising the exception.
+        pa.errors.SchemaError: If data fails validation. Failure cases are
+                               logged before raising the exception.
+        pa.errors.SchemaErrors: If data fails validation with DEBUG_VALIDATION
+                                set, after logging all failure cases.
     """
     logging.info("Validating data against the WIDE-FORMAT quality schema")
 
     try:
         schema = get_wide_schema()
 
-        # Re-run transformation pipeline to get fresh DataFrame
-        df = transform_to_dataframe()
-        validated_df = schema.validate(df, lazy=True)
+        # Only run the transformation pipeline if the caller has not already
+        if df is None:
+            df = transform_to_dataframe(raw_data)
+
+        # Hash every row and only validate those not seen in the last passing run
+        row_hashes = pd.util.hash_pandas_object(df, index=False)
+        changed = df[~row_hashes.isin(load_validated_hashes())]
+        logging.info(f"Validating {len(changed)} new or changed rows out of {len(df)}")
+
+        # Fail fast on the first failing check; collecting every failure case
+        # across all columns is only worth it when debugging bad data
+        schema.validate(changed, lazy=os.getenv("DEBUG_VALIDATION") == "1")
+        save_validated_hashes(row_hashes)
 
         logging.info("Data validation successful.")
-        return validated_df
+        return df
 
-    except pa.errors.SchemaErrors as err:
-        # If validation fails, log all errors for debugging
+    except (pa.errors.SchemaError, pa.errors.SchemaErrors) as err:
+        # If validation fails, log the failure cases for debugging
         logging.error("Data validation failed. See failure cases below.")
         logging.error(err.failure_cases)
         raise err 
@@ -1,26 +1,67 @@
+import hashlib
+import re
+import numpy as np
+import pandas as pd
 import pandera as pa
 from datetime import datetime
+from functools import lru_cache
 from util.config import start_year, end_year
 
+# ISO3 country codes: exactly three uppercase letters
+iso3_pattern = re.compile(r'^[A-Z]{3}$')
 
+
+def check_iso3(series: pd.Series) -> pd.Series:
+    """
+    Check that every value in the column is an ISO3 country code.
+
+    The column only holds one code per ECOWAS country, so the regex is run
+    once per distinct value and the results are mapped back to the rows
+    through the factorized codes.
+
+    Args:
+        series (pd.Series): The country_iso3 column.
+
+    Returns:
+        pd.Series: Boolean mask, True where the value is a valid code.
+    """
+    codes, uniques = pd.factorize(series)
+    valid = (
+        pd.Series(uniques, dtype="string")
+        .str.fullmatch(iso3_pattern)
+        .to_numpy(dtype=bool, na_value=False)
+    )
+
+    # Missing values get code -1, which picks the trailing True; nulls are
+    # rejected by the column's nullable=False instead
+    return pd.Series(np.append(valid, True)[codes], index=series.index)
+
+
+@lru_cache(maxsize=1)
 def get_wide_schema() -> pa.DataFrameSchema:
+    """
+    Build the Pandera schema for the wide-format indicator table.
+
+    The schema only depends on config, so it is built once per process and
+    cached; all checks run vectorized over each column.
 
+    Returns:
+        pa.DataFrameSchema: Schema validating identifiers and indicator columns.
+    """
     schema = pa.DataFrameSchema(
         columns={
             # Basic identifiers
             "country_name": pa.Column(pa.String, nullable=False),  
             "country_iso3": pa.Column(
                 pa.String,
-                checks=[pa.Check.str_matches(r'^[A-Z]{3}$')], 
+                checks=[pa.Check(check_iso3, element_wise=False, name="iso3_format")],
                 nullable=False
             ),
 
             "year": pa.Column(
-                pa.Int,
-                checks=[
-                    pa.Check.ge(start_year),       
-                    pa.Check.le(end_year)
-                ],
+                pa.Int16,
+                # One range comparison instead of separate ge/le checks
+                checks=[pa.Check.in_range(start_year, end_year)],
                 nullable=False
             ),
 
@@ -89,3 +130,27 @@ def get_wide_schema() -> pa.DataFrameSchema:
     )
 
     return schema
+
+
+@lru_cache(maxsize=1)
+def get_schema_fingerprint() -> str:
+    """
+    Fingerprint the wide schema, so results recorded under another schema can be told apart.
+
+    Covers every column's dtype, nullability and the names and parameters of
+    its checks, plus the DataFrame-level options. The body of a custom check
+    function is not covered; rename the check when its logic changes.
+
+    Returns:
+        str: First 16 hex characters of the SHA-256 of the schema description.
+    """
+    schema = get_wide_schema()
+    description = repr([
+        [
+            (name, str(column.dtype), column.nullable, [(check.name, check.statistics) for check in column.checks])
+            for name, column in schema.columns.items()
+        ],
+        schema.strict,
+        schema.unique,
+    ])
+    return hashlib.sha256(description.encode("utf-8")).hexdigest()[:16]
@@ -35,9 +35,10 @@ def task_fail_alert(context):
     em['Subject'] = subject
     em.set_content(body)
 
-    context = ssl.create_default_context()
+    ssl_context = ssl.create_default_context()
 
-    with smtplib.SMTP_SSL('SMTP.gmail.com', 465, context=context) as smtp:
+    with smtplib.SMTP_SSL('SMTP.gmail.com', 465, context=ssl_context) as smtp:
         smtp.login(email_sender, email_password)
-        smtp.sendmail(email_sender, email_receiver, em.as_string())
-        print("Email Sent Successfully")
\ No newline at end of file
+        # send_message reads sender and recipients from the headers
+        smtp.send_message(em)
+        print("Email Sent Successfully")
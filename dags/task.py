@@ -21,6 +21,8 @@ with DAG(
     schedule='@daily',
     catchup=False,
     params={"dag_owner": "DE Team"},
+    # Render XCom pulls as Python objects rather than strings
+    render_template_as_native_obj=True,
 ) as dag:
     
     extract_data = PythonOperator(
@@ -30,7 +32,8 @@ with DAG(
 
     tranform_validate = PythonOperator(
         task_id="tranform_and_validate_data",
-        python_callable=validate_data
+        python_callable=validate_data,
+        op_kwargs={"raw_data": "{{ ti.xcom_pull(task_ids='extract_agric_data') }}"}
     )
 
     table_creation = PythonOperator(
@@ -40,7 +43,9 @@ with DAG(
 
     load_data = PythonOperator(
         task_id="loading_to_postgres",
-        python_callable=load_dataframe_to_postgres
+        python_callable=load_dataframe_to_postgres,
+        # Reuse the frame returned by the validation task instead of redoing the transform
+        op_kwargs={"df": "{{ ti.xcom_pull(task_ids='tranform_and_validate_data') }}"}
     )
 
 
@@ -57,6 +57,15 @@ database_table_name = "west_african_agri_metrics_wide"
 start_year = 1999
 end_year = 2022
 
-json_folder = "/opt/airflow/tmp/raw_data.json"
+raw_data_file = "/opt/airflow/tmp/raw_data.parquet"
+
+# Extracted records are passed between tasks through XCom; set to True to
+# also write them to raw_data_file for debugging
+persist_raw_data = False
+
+# Row hashes of the last successfully validated data, used to skip
+# re-validating unchanged rows. Each worker keeps its own copy, and it is
+# ignored once the validation schema changes
+validated_rows_manifest = "/opt/airflow/tmp/last_rows.parquet"
 
 postgres_conn_id = "postgres_default"
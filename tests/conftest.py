@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+# Make the dags folder importable the way Airflow does, so tests can import
+# the util and includes packages directly
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "dags"))
+
+
+@pytest.fixture(scope="session")
+def dag_bag():
+    """
+    Load the dags once and share the DagBag across all tests
+    """
+    from airflow.models import DagBag
+
+    return DagBag(dag_folder="dag/", include_examples=False)
@@ -1,14 +1,8 @@
-from airflow.models import DagBag
-
-
-def test_dags_contains_tasks():
+def test_dags_contains_tasks(dag_bag):
     """
     Test that each dag contains at least one task
     """
 
-    # load the dags
-    dag_bag = DagBag(dag_folder="dag/", include_examples=False)
-
     # create empty list for empty dags
     empty_dags = []
 
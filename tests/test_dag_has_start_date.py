@@ -1,13 +1,8 @@
-from airflow.models import DagBag
-
-
-def test_dag_has_start_date():
+def test_dag_has_start_date(dag_bag):
     """
     Test that all DAGs have start_date either
     directly in the DAG or in default_args.
     """
-    dag_bag = DagBag(dag_folder="dag/", include_examples=False)
-
     dag_without_start_date = []
 
     for dag_id, dag in dag_bag.dags.items():
@@ -1,12 +1,7 @@
-from airflow.models import DagBag
-
-
-def test_dag_import_error():
+def test_dag_import_error(dag_bag):
     """
     Checks that the Airflow dags have no import errors
     """
-    dag_bag = DagBag(dag_folder="dag/", include_examples=False)
-
     # check for dag import errors
     assert (
         not dag_bag.import_errors
@@ -1,12 +1,7 @@
-from airflow.models import DagBag
-
-
-def test_false_dag_catchup():
+def test_false_dag_catchup(dag_bag):
     """
     Test that the DAG has catchup set to False
     """
-    dag_bag = DagBag(dag_folder="dag/", include_examples=False)
-
     # loop through the dags to get all dags
     for dag_id, dag in dag_bag.dags.items():
         assert (
@@ -0,0 +1,119 @@
+import io
+import json
+import re
+
+import ijson
+import pytest
+import requests
+
+from includes import extraction
+from includes.extraction import batch_indicator_code, count_pages, extract_world_bank_data, fetch_indicator_page
+from util.config import indicators
+
+
+class FakeResponse:
+    """
+    Streaming response stand-in serving a fixed JSON body
+    """
+
+    def __init__(self, body):
+        self.raw = io.BytesIO(json.dumps(body).encode("utf-8"))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    """
+    Session stand-in answering World Bank indicator URLs with paginated records
+    """
+
+    def __init__(self, pages, reject_batch=False, fail_page=None):
+        self.pages = pages
+        self.reject_batch = reject_batch
+        self.fail_page = fail_page
+        self.requests = []
+
+    def get(self, url, timeout=None, stream=False):
+        indicator_code = re.search(r"/indicator/([^?]+)", url).group(1)
+        page = int(re.search(r"[?&]page=(\d+)", url).group(1))
+        self.requests.append((indicator_code, page))
+
+        if page == self.fail_page:
+            raise requests.exceptions.ConnectionError("connection reset")
+
+        # the API answers a rejected query with a message instead of records
+        if self.reject_batch and indicator_code == batch_indicator_code:
+            return FakeResponse([{"message": [{"id": "120", "value": "Invalid value"}]}])
+
+        metadata = {"page": page, "pages": self.pages, "per_page": 1, "total": self.pages}
+        record = {"indicator": {"id": indicator_code}, "countryiso3code": "NGA", "date": str(2000 + page), "value": 1.5}
+        return FakeResponse([metadata, [record]])
+
+
+def test_count_pages_records_page_count():
+    """
+    Test that count_pages picks out the page count and passes events through
+    """
+    body = json.dumps([{"page": 1, "pages": 4}, [{"value": 1}]]).encode("utf-8")
+    meta = {}
+
+    events = list(count_pages(ijson.parse(io.BytesIO(body)), meta))
+
+    assert meta == {"pages": 4}
+    assert events == list(ijson.parse(io.BytesIO(body)))
+
+
+def test_fetch_indicator_page_returns_page_count_and_records(monkeypatch):
+    """
+    Test that one page yields the total page count and its records
+    """
+    monkeypatch.setattr(extraction, "http_session", FakeSession(pages=3))
+
+    pages, records = fetch_indicator_page("SP.POP.TOTL", 2)
+
+    assert pages == 3
+    assert [record["date"] for record in records] == ["2002"]
+
+
+def test_extract_follows_up_every_page_once(monkeypatch):
+    """
+    Test that the pages after the first are each requested exactly once
+    """
+    session = FakeSession(pages=3)
+    monkeypatch.setattr(extraction, "http_session", session)
+
+    records = extract_world_bank_data()
+
+    assert sorted(session.requests) == [(batch_indicator_code, page) for page in (1, 2, 3)]
+    assert len(records) == 3
+
+
+def test_extract_raises_on_failed_follow_up_page(monkeypatch):
+    """
+    Test that a failed page after the first fails the extract instead of dropping its records
+    """
+    monkeypatch.setattr(extraction, "http_session", FakeSession(pages=4, fail_page=3))
+
+    with pytest.raises(RuntimeError):
+        extract_world_bank_data()
+
+
+def test_extract_falls_back_to_single_indicators(monkeypatch):
+    """
+    Test that a rejected batch query is retried one indicator at a time
+    """
+    session = FakeSession(pages=2, reject_batch=True)
+    monkeypatch.setattr(extraction, "http_session", session)
+
+    records = extract_world_bank_data()
+
+    expected = [(batch_indicator_code, 1)] + [(code, page) for code in indicators for page in (1, 2)]
+    assert sorted(session.requests) == sorted(expected)
+    assert len(records) == 2 * len(indicators)
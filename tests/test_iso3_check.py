@@ -0,0 +1,31 @@
+import pandas as pd
+import pandera as pa
+import pytest
+
+from includes.validation import check_iso3, get_wide_schema
+
+
+def test_check_iso3_maps_results_back_to_rows():
+    """
+    Test that check_iso3 flags each row by its own value and keeps the index
+    """
+    series = pd.Series(["NGA", "ngA", "GHA", None, "NGA", "GHAN"], index=[10, 11, 12, 13, 14, 15])
+
+    result = check_iso3(series)
+
+    # missing values are left to the column's nullable=False
+    assert result.tolist() == [True, False, True, True, True, False]
+    assert result.index.tolist() == series.index.tolist()
+
+
+def test_schema_rejects_invalid_iso3():
+    """
+    Test that the wide schema reports the row with the invalid country code
+    """
+    column = get_wide_schema().columns["country_iso3"]
+    df = pd.DataFrame({"country_iso3": ["NGA", "ng", "GHA"]})
+
+    with pytest.raises(pa.errors.SchemaError) as exc_info:
+        column.validate(df)
+
+    assert exc_info.value.failure_cases["failure_case"].tolist() == ["ng"]